@@ -1,37 +1,8 @@
-import itertools
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-
-def rotate(sequence):
-    """Generate all rotations of a given sequence."""
-    return [sequence[i:] + sequence[:i] for i in range(len(sequence))]
-
-def unique_permutations_with_fixed_first(n, k):
-    """Find all unique permutations of k '1's in n positions under rotation, with the first position fixed to '1'."""
-    if k == 0:
-        return ['0' * n]
-    if k == n:
-        return ['1' * n]
-    
-    # Adjust k and n since we are fixing the first position to '1'
-    k = k - 1
-    n = n - 1
-    
-    combinations = list(itertools.combinations(range(n), k))
-    unique = []
-
-    for combo in combinations:
-        sequence = ['0'] * n
-        for index in combo:
-            sequence[index] = '1'
-        sequence = '1' + ''.join(sequence)  # Ensure the first position is '1'
-        rotations = rotate(sequence)
-        
-        if not any(rot in unique for rot in rotations):
-            unique.append(sequence)
-    
-    return unique
+from matrix_storage import allocate_matrix, blocked_sum, heatmap_view
+from scale_tables import rotate, unique_permutations_with_fixed_first
 
 def count_overlaps(perm1, perm2):
     """Count how many times perm1 overlaps within any rotation of perm2."""
@@ -44,24 +15,34 @@ def count_overlaps(perm1, perm2):
                 overlap_count += 1
     return overlap_count
 
-def permutation_overlap_counts_with_fixed_first(n, k1, k2):
+def permutation_overlap_counts_with_fixed_first(n, k1, k2, storage_file=None, block_rows=256):
     """Generate the overlap counts for permutations of k1 '1's in permutations of k2 '1's with the first position fixed to '1'."""
     perms_k1 = unique_permutations_with_fixed_first(n, k1)
     perms_k2 = unique_permutations_with_fixed_first(n, k2)
     
-    overlap_counts = np.zeros((len(perms_k1), len(perms_k2)), dtype=int)
+    # A single pair overlaps at most once per rotation and offset, i.e. n * n times
+    overlap_counts = allocate_matrix((len(perms_k1), len(perms_k2)), n * n, storage_file)
     
-    for i, perm1 in enumerate(perms_k1):
-        for j, perm2 in enumerate(perms_k2):
-            overlap_counts[i][j] = count_overlaps(perm1, perm2)
+    # Fill one block of rows at a time so only that block is held in memory before it is written out
+    for start in range(0, len(perms_k1), block_rows):
+        stop = min(start + block_rows, len(perms_k1))
+        block = np.zeros((stop - start, len(perms_k2)), dtype=overlap_counts.dtype)
+        for i, perm1 in enumerate(perms_k1[start:stop]):
+            for j, perm2 in enumerate(perms_k2):
+                block[i][j] = count_overlaps(perm1, perm2)
+        overlap_counts[start:stop] = block
+        if isinstance(overlap_counts, np.memmap):
+            overlap_counts.flush()
     
     return overlap_counts
 
-def visualize_heatmap(overlap_counts, k1, k2):
+def visualize_heatmap(overlap_counts, k1, k2, max_cells=100):
     """Visualize the overlap counts as a heatmap."""
+    cells, title, annot = heatmap_view(
+        overlap_counts, f"Overlap Counts of {k1} '1's in {k2} '1's with the First Position Fixed", max_cells)
     plt.figure(figsize=(10, 8))
-    sns.heatmap(overlap_counts, annot=True, cmap='viridis', fmt='d')
-    plt.title(f"Overlap Counts of {k1} '1's in {k2} '1's with the First Position Fixed")
+    sns.heatmap(cells, annot=annot, cmap='viridis', fmt='d')
+    plt.title(title)
     plt.xlabel(f"Unique Permutations of {k2} '1's")
     plt.ylabel(f"Unique Permutations of {k1} '1's")
     plt.show()
@@ -70,10 +51,11 @@ def visualize_heatmap(overlap_counts, k1, k2):
 positions = 12
 k1 = 3
 k2 = 7
-overlap_counts = permutation_overlap_counts_with_fixed_first(positions, k1, k2)
+storage_file = None  # Set to a .npy path to keep the matrix on disk instead of in memory
+overlap_counts = permutation_overlap_counts_with_fixed_first(positions, k1, k2, storage_file)
 
 # Calculate the sum of all elements in the overlap counts matrix
-total_overlaps = np.sum(overlap_counts)
+total_overlaps = blocked_sum(overlap_counts)
 
 # Print the total overlaps
 print(f"Total Overlaps of {k1} '1's in {k2} '1's: {total_overlaps}")
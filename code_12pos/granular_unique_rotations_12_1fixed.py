@@ -1,37 +1,7 @@
-import itertools
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-
-def rotate(sequence):
-    """Generate all rotations of a given sequence."""
-    return [sequence[i:] + sequence[:i] for i in range(len(sequence))]
-
-def unique_permutations_with_fixed_first(n, k):
-    """Find all unique permutations of k '1's in n positions under rotation, with the first position fixed to '1'."""
-    if k == 0:
-        return ['0' * n]
-    if k == n:
-        return ['1' * n]
-    
-    # Adjust k and n since we are fixing the first position to '1'
-    k = k - 1
-    n = n - 1
-    
-    combinations = list(itertools.combinations(range(n), k))
-    unique = []
-
-    for combo in combinations:
-        sequence = ['0'] * n
-        for index in combo:
-            sequence[index] = '1'
-        sequence = '1' + ''.join(sequence)  # Ensure the first position is '1'
-        rotations = rotate(sequence)
-        
-        if not any(rot in unique for rot in rotations):
-            unique.append(sequence)
-    
-    return unique
+from scale_tables import rotate, unique_permutations_with_fixed_first
 
 def count_overlaps(perm1, perm2):
     """Count how many times perm1 is found within any rotation of perm2."""
@@ -1,7 +1,9 @@
-import itertools
 import numpy as np
 import matplotlib.pyplot as plt
 import os
+from scale_tables import (MAX_TABLE_POSITIONS, canonical_scale_names, find_min_dissimilarity, masks_to_bits,
+                          match_scale, rotate, rotate_masks, rotation_tables, to_mask, to_sequence,
+                          unique_permutations_with_fixed_first)
 
 # Define known scales and their binary representations
 known_scales = {
@@ -12,118 +14,92 @@ known_scales = {
     "Double Harmonic": "110101011001"
 }
 
-def rotate(sequence):
-    """Generate all rotations of a given sequence."""
-    return [sequence[i:] + sequence[:i] for i in range(len(sequence))]
-
-def unique_permutations_with_fixed_first(n, k):
-    """Find all unique permutations of k '1's in n positions under rotation, with the first position fixed to '1'."""
-    if k == 0:
-        return ['0' * n]
-    if k == n:
-        return ['1' * n]
-    
-    # Adjust k and n since we are fixing the first position to '1'
-    k = k - 1
-    n = n - 1
-    
-    combinations = list(itertools.combinations(range(n), k))
-    unique = []
-
-    for combo in combinations:
-        sequence = ['0'] * n
-        for index in combo:
-            sequence[index] = '1'
-        sequence = '1' + ''.join(sequence)  # Ensure the first position is '1'
-        rotations = rotate(sequence)
-        
-        if not any(rot in unique for rot in rotations):
-            unique.append(sequence)
-    
-    return unique
-
-def calculate_dissimilarity(seq1, seq2):
-    """Calculate the number of dissimilar positions between two sequences."""
-    return sum(c1 != c2 for c1, c2 in zip(seq1, seq2))
-
-def find_min_dissimilarity(patterns, target_scale):
-    """Find the minimum dissimilarity between rotations of the target scale and given patterns."""
-    target_rotations = rotate(target_scale)
-    
-    min_dissimilarity_results = []
-    
-    for pattern in patterns:
-        pattern_rotations = rotate(pattern)
-        min_dissimilarity = float('inf')
-        best_matches = []
-        
-        for pat_rot in pattern_rotations:
-            for target_rot in target_rotations:
-                dissimilarity = calculate_dissimilarity(pat_rot, target_rot)
-                if dissimilarity < min_dissimilarity:
-                    min_dissimilarity = dissimilarity
-                    best_matches = [(pat_rot, target_rot)]
-                elif dissimilarity == min_dissimilarity:
-                    best_matches.append((pat_rot, target_rot))
-        
-        unique_matches = []
-        seen_patterns = set()
-        for pat_rot, target_rot in best_matches:
-            pat_tuple = tuple(int(char) for char in pat_rot)
-            if pat_tuple not in seen_patterns:
-                seen_patterns.update(tuple(int(char) for char in rot) for rot in rotate(pat_rot))
-                unique_matches.append((pat_rot, target_rot))
-        
-        min_dissimilarity_results.append((pattern, min_dissimilarity, unique_matches))
-    
-    return min_dissimilarity_results
-
 def match_scale_to_known(scale):
     """Match a scale to a known scale if possible."""
-    for name, known_scale in known_scales.items():
-        if scale in rotate(known_scale):
-            return name
-    return None
+    return match_scale(scale, known_scales)
+
+def align_to_ionian_start(masks, n, ionian_pattern="101011010101"):
+    """Rotate every mask in the Ionian pattern's rotation class onto the Ionian pattern, leaving the rest unchanged."""
+    tables = rotation_tables(n)
+    masks = np.asarray(masks, dtype=np.uint32)
+    ionian_mask = to_mask(ionian_pattern)
+    
+    # Both rotate onto the same canonical form, so the difference of their rotation indices maps one onto the other
+    in_class = tables['canonical'][masks] == tables['canonical'][ionian_mask]
+    shifts = (tables['rotation_index'][masks].astype(np.int64) - int(tables['rotation_index'][ionian_mask])) % n
+    return rotate_masks(masks, np.where(in_class, shifts, 0), n)
 
 def rotate_to_ionian_start(pattern, ionian_pattern="101011010101"):
     """Rotate the pattern to start with the same sequence as the Ionian pattern."""
+    n = len(pattern)
+    if len(ionian_pattern) == n and n <= MAX_TABLE_POSITIONS:
+        return to_sequence(align_to_ionian_start(to_mask(pattern), n, ionian_pattern), n)
+    
     rotations = rotate(pattern)
     for rot in rotations:
         if rot.startswith(ionian_pattern):
             return rot
     return pattern
 
-def collect_visualizations(results, target_scale):
-    """Collect the pattern matches with minimum dissimilarity as visualizations."""
-    visualizations = []
+def sequences_to_bits(sequences, n):
+    """Convert binary strings of length n into uint8 rows of bits in one pass."""
+    return np.frombuffer(''.join(sequences).encode(), dtype=np.uint8).reshape(-1, n) - ord('0')
+
+def collect_visualizations(results, target_scale, ionian_pattern="101011010101"):
+    """Collect the pattern matches with minimum dissimilarity as a batch of images, sorted by dissimilarity."""
+    n = len(target_scale)
+    matches = [(pattern, min_dissimilarity, pat_rot, target_rot)
+               for pattern, min_dissimilarity, pattern_matches in results
+               for pat_rot, target_rot in pattern_matches]
     
-    for pattern, min_dissimilarity, matches in results:
-        for pat_rot, target_rot in matches:
-            pat_rot = rotate_to_ionian_start(pat_rot)  # Ensure the pattern starts with the Ionian mode sequence
-            target_rot = rotate_to_ionian_start(target_rot)  # Ensure the Ionian mode sequence is correctly aligned
-            pat_rot_array = np.array([int(char) for char in pat_rot])
-            target_rot_array = np.array([int(char) for char in target_rot])
-            combined_array = np.vstack((target_rot_array, pat_rot_array))
-            matched_scale = match_scale_to_known(pat_rot)
-            visualizations.append((min_dissimilarity, combined_array, pattern, matched_scale))
+    dissimilarities = np.array([match[1] for match in matches], dtype=np.int64)
+    order = np.argsort(dissimilarities, kind='stable')
+    patterns = [matches[i][0] for i in order]
+    pat_rots = [matches[i][2] for i in order]
+    target_rots = [matches[i][3] for i in order]
     
-    return visualizations
+    if len(ionian_pattern) == n and n <= MAX_TABLE_POSITIONS:
+        # Align all matched pairs at once so both rows start with the Ionian mode sequence
+        pat_masks = align_to_ionian_start(np.array([to_mask(rot) for rot in pat_rots], dtype=np.uint32), n, ionian_pattern)
+        target_masks = align_to_ionian_start(np.array([to_mask(rot) for rot in target_rots], dtype=np.uint32), n, ionian_pattern)
+        
+        # One (target, pattern) pair of rows per match: shape (matches, 2, n)
+        images = np.stack((masks_to_bits(target_masks, n), masks_to_bits(pat_masks, n)), axis=1)
+        
+        lookup = canonical_scale_names(known_scales, n)
+        matched_scales = [lookup.get(int(canonical)) for canonical in rotation_tables(n)['canonical'][pat_masks]]
+    else:
+        # Partial Ionian prefixes and scales too long to tabulate are aligned one string at a time
+        pat_rots = [rotate_to_ionian_start(rot, ionian_pattern) for rot in pat_rots]
+        target_rots = [rotate_to_ionian_start(rot, ionian_pattern) for rot in target_rots]
+        images = np.stack((sequences_to_bits(target_rots, n), sequences_to_bits(pat_rots, n)), axis=1)
+        matched_scales = [match_scale_to_known(rot) for rot in pat_rots]
+    
+    return dissimilarities[order], images, patterns, matched_scales
 
 def plot_all_visualizations(visualizations, output_file):
-    """Plot all visualizations in a single figure, sorted by dissimilarity."""
-    visualizations.sort(key=lambda x: x[0])  # Sort by dissimilarity
+    """Plot all visualizations as a single image, in the order they were collected."""
+    dissimilarities, images, patterns, matched_scales = visualizations
+    total_visualizations, rows, n = images.shape
     
-    total_visualizations = len(visualizations)
-    fig_height = total_visualizations * 2
-    fig, axs = plt.subplots(total_visualizations, 1, figsize=(12, fig_height))
+    # Separate the pairs with a blank row and draw the whole batch with one imshow call
+    stacked = np.pad(images, ((0, 0), (0, 1), (0, 0))).reshape(-1, n)
     
-    for idx, (dissimilarity, combined_array, pattern, matched_scale) in enumerate(visualizations):
-        axs[idx].imshow(combined_array, cmap='binary', aspect='auto')
+    titles = []
+    for dissimilarity, pattern, matched_scale in zip(dissimilarities, patterns, matched_scales):
         title = f"Pattern: {pattern}, Dissimilarity: {dissimilarity}"
         if matched_scale:
             title += f", Matches: {matched_scale}"
-        axs[idx].set_title(title, fontsize=12)
-        axs[idx].axis('off')
+        titles.append(title)
+    
+    fig, ax = plt.subplots(figsize=(12, total_visualizations))
+    ax.imshow(stacked, cmap='binary', aspect='auto', interpolation='nearest', vmin=0, vmax=1)
+    ax.set_yticks(np.arange(total_visualizations) * (rows + 1) + (rows - 1) / 2)
+    ax.set_yticklabels(titles, fontsize=12)
+    ax.set_xticks([])
+    ax.tick_params(left=False)
+    for spine in ax.spines.values():
+        spine.set_visible(False)
     
     plt.tight_layout()
     plt.savefig(output_file, dpi=300, bbox_inches='tight')
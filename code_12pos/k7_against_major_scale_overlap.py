@@ -1,8 +1,10 @@
-import itertools
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
+from matrix_storage import allocate_matrix, heatmap_view
+from scale_tables import (MAX_TABLE_POSITIONS, calculate_dissimilarity, find_min_dissimilarity, popcount, rotate,
+                          rotate_masks, to_mask, unique_permutations_with_fixed_first)
 
 # Define known scales and their binary representations
 known_scales = {
@@ -13,95 +15,40 @@ known_scales = {
     "Double Harmonic": "110101011001"
 }
 
-def rotate(sequence):
-    """Generate all rotations of a given sequence."""
-    return [sequence[i:] + sequence[:i] for i in range(len(sequence))]
-
-def unique_permutations_with_fixed_first(n, k):
-    """Find all unique permutations of k '1's in n positions under rotation, with the first position fixed to '1'."""
-    if k == 0:
-        return ['0' * n]
-    if k == n:
-        return ['1' * n]
-    
-    # Adjust k and n since we are fixing the first position to '1'
-    k = k - 1
-    n = n - 1
-    
-    combinations = list(itertools.combinations(range(n), k))
-    unique = []
-
-    for combo in combinations:
-        sequence = ['0'] * n
-        for index in combo:
-            sequence[index] = '1'
-        sequence = '1' + ''.join(sequence)  # Ensure the first position is '1'
-        rotations = rotate(sequence)
-        
-        if not any(rot in unique for rot in rotations):
-            unique.append(sequence)
-    
-    return unique
-
-def calculate_dissimilarity(seq1, seq2):
-    """Calculate the number of dissimilar positions between two sequences."""
-    return sum(c1 != c2 for c1, c2 in zip(seq1, seq2))
-
-def find_min_dissimilarity(patterns, target_scale):
-    """Find the minimum dissimilarity between rotations of the target scale and given patterns."""
-    target_rotations = rotate(target_scale)
-    
-    min_dissimilarity_results = []
-    
-    for pattern in patterns:
-        pattern_rotations = rotate(pattern)
-        min_dissimilarity = float('inf')
-        best_matches = []
-        
-        for pat_rot in pattern_rotations:
-            for target_rot in target_rotations:
-                dissimilarity = calculate_dissimilarity(pat_rot, target_rot)
-                if dissimilarity < min_dissimilarity:
-                    min_dissimilarity = dissimilarity
-                    best_matches = [(pat_rot, target_rot)]
-                elif dissimilarity == min_dissimilarity:
-                    best_matches.append((pat_rot, target_rot))
-        
-        unique_matches = []
-        seen_patterns = set()
-        for pat_rot, target_rot in best_matches:
-            pat_tuple = tuple(int(char) for char in pat_rot)
-            if pat_tuple not in seen_patterns:
-                seen_patterns.update(tuple(int(char) for char in rot) for rot in rotate(pat_rot))
-                unique_matches.append((pat_rot, target_rot))
-        
-        min_dissimilarity_results.append((pattern, min_dissimilarity, unique_matches))
-    
-    return min_dissimilarity_results
-
-def generate_overlap_matrix(patterns, ionian_pattern):
+def generate_overlap_matrix(patterns, ionian_pattern, storage_file=None, block_rows=256):
     """Generate an overlap matrix for the dissimilarity numbers."""
     num_patterns = len(patterns)
-    overlap_matrix = np.zeros((num_patterns, num_patterns))
+    # Dissimilarity can never exceed the pattern length
+    overlap_matrix = allocate_matrix((num_patterns, num_patterns), len(ionian_pattern), storage_file)
     
-    ionian_rotations = rotate(ionian_pattern)
+    # Every row repeats its pattern's minimum dissimilarity, so it is computed once per pattern
+    n = len(ionian_pattern)
+    if n <= MAX_TABLE_POSITIONS:
+        ionian_rotations = rotate_masks(to_mask(ionian_pattern), np.arange(n), n)
+        pattern_masks = np.array([to_mask(pattern) for pattern in patterns], dtype=np.uint32)
+        min_dissimilarities = popcount(pattern_masks[:, np.newaxis] ^ ionian_rotations).min(axis=1)
+    else:
+        ionian_rotations = rotate(ionian_pattern)
+        min_dissimilarities = np.array([
+            min(calculate_dissimilarity(pattern, ionian_rot) for ionian_rot in ionian_rotations)
+            for pattern in patterns
+        ], dtype=overlap_matrix.dtype)
     
-    for i, pattern in enumerate(patterns):
-        min_dissimilarity = float('inf')
-        for ionian_rot in ionian_rotations:
-            dissimilarity = calculate_dissimilarity(pattern, ionian_rot)
-            if dissimilarity < min_dissimilarity:
-                min_dissimilarity = dissimilarity
-        for j in range(num_patterns):
-            overlap_matrix[i, j] = min_dissimilarity
+    # Broadcast into one block of rows at a time so memory stays bounded for large matrices
+    for start in range(0, num_patterns, block_rows):
+        stop = min(start + block_rows, num_patterns)
+        overlap_matrix[start:stop] = min_dissimilarities[start:stop, np.newaxis]
+        if isinstance(overlap_matrix, np.memmap):
+            overlap_matrix.flush()
     
     return overlap_matrix
 
-def plot_overlap_matrix(overlap_matrix, output_file):
+def plot_overlap_matrix(overlap_matrix, output_file, max_cells=100):
     """Plot the overlap matrix as a heatmap."""
+    cells, title, annot = heatmap_view(overlap_matrix, "Dissimilarity Overlap Matrix", max_cells)
     plt.figure(figsize=(10, 8))
-    sns.heatmap(overlap_matrix, annot=True, cmap='viridis', fmt='.0f', cbar=True)
-    plt.title("Dissimilarity Overlap Matrix")
+    sns.heatmap(cells, annot=annot, cmap='viridis', fmt='.0f', cbar=True)
+    plt.title(title)
     plt.xlabel("Pattern Index")
     plt.ylabel("Pattern Index")
     plt.tight_layout()
@@ -121,7 +68,8 @@ min_dissimilarity_results = find_min_dissimilarity(patterns, major_scale)
 patterns_only = [result[0] for result in min_dissimilarity_results]
 
 # Generate the overlap matrix
-overlap_matrix = generate_overlap_matrix(patterns_only, major_scale)
+storage_file = None  # Set to a .npy path to keep the matrix on disk instead of in memory
+overlap_matrix = generate_overlap_matrix(patterns_only, major_scale, storage_file)
 
 # Define the output file for the overlap matrix
 overlap_matrix_file = r"C:\Users\ptgyo\pitch-permutations-main\scales in 12 positions media\k7 compared to major scale\overlap_matrix.png"
@@ -0,0 +1,32 @@
+import numpy as np
+
+def allocate_matrix(shape, max_value, storage_file=None):
+    """Allocate a zeroed matrix with the smallest dtype that holds max_value, memory-mapped to storage_file if given."""
+    dtype = np.min_scalar_type(max_value)
+    if storage_file is None:
+        return np.zeros(shape, dtype=dtype)
+    return np.lib.format.open_memmap(storage_file, mode='w+', dtype=dtype, shape=shape)
+
+def blocked_sum(matrix, block_rows=256):
+    """Sum a matrix one block of rows at a time."""
+    total = 0
+    for start in range(0, matrix.shape[0], block_rows):
+        total += int(matrix[start:start + block_rows].sum(dtype=np.int64))
+    return total
+
+def reduce_blocks(matrix, step):
+    """Reduce a matrix to the maximum of each step x step block, reading one block of rows at a time."""
+    rows, cols = matrix.shape
+    col_starts = np.arange(0, cols, step)
+    reduced = np.empty((-(-rows // step), len(col_starts)), dtype=matrix.dtype)
+    for i, start in enumerate(range(0, rows, step)):
+        reduced[i] = np.maximum.reduceat(matrix[start:start + step].max(axis=0), col_starts)
+    return reduced
+
+def heatmap_view(matrix, title, max_cells=100):
+    """Reduce a matrix to at most max_cells per side for a heatmap, returning the cells, title and whether to annotate."""
+    # Large matrices are reduced to the maximum of each block so every cell still contributes
+    step = max(1, -(-max(matrix.shape) // max_cells))
+    if step > 1:
+        title += f" (max of each {step}x{step} block)"
+    return reduce_blocks(matrix, step), title, step == 1
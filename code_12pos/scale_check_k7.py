@@ -1,6 +1,6 @@
-import itertools
 import numpy as np
 import matplotlib.pyplot as plt
+from scale_tables import match_scale, unique_permutations_with_fixed_first
 
 # Define the known heptatonic scales and their binary representations
 known_scales = {
@@ -12,39 +12,13 @@ known_scales = {
     "Double Harmonic": "110101011001"
 }
 
-def rotate(sequence):
-    """Generate all rotations of a given sequence."""
-    return [sequence[i:] + sequence[:i] for i in range(len(sequence))]
-
-def unique_permutations_with_fixed_first(n, k):
-    """Find all unique permutations of k '1's in n positions under rotation, with the first position fixed to '1'."""
-    # Adjust k since we are fixing the first position to '1'
-    k = k - 1
-    n = n - 1
-    
-    combinations = list(itertools.combinations(range(n), k))
-    unique = []
-
-    for combo in combinations:
-        sequence = ['0'] * n
-        for index in combo:
-            sequence[index] = '1'
-        sequence = '1' + ''.join(sequence)  # Ensure the first position is '1'
-        rotations = rotate(sequence)
-        
-        if not any(rot in unique for rot in rotations):
-            unique.append(sequence)
-    
-    return unique
-
 def match_known_scales(sequences, known_scales):
     """Match the given sequences to known scales and their rotations."""
     matches = []
     for seq in sequences:
-        for scale_name, scale in known_scales.items():
-            if seq in rotate(scale):
-                matches.append((seq, scale_name))
-                break
+        scale_name = match_scale(seq, known_scales)
+        if scale_name:
+            matches.append((seq, scale_name))
     return matches
 
 def visualize_rotations(n, k, output_file, known_scales):
@@ -0,0 +1,197 @@
+import functools
+import itertools
+import numpy as np
+
+# Masks above this many positions are too large to tabulate and fall back to string rotation
+MAX_TABLE_POSITIONS = 24
+
+# Number of '1' bits in every byte value
+BYTE_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+def rotate(sequence):
+    """Generate all rotations of a given sequence."""
+    return [sequence[i:] + sequence[:i] for i in range(len(sequence))]
+
+def to_mask(sequence):
+    """Convert a binary string to an integer mask, first position as the highest bit."""
+    return int(sequence, 2)
+
+def to_sequence(mask, n):
+    """Convert an integer mask back to a binary string of length n."""
+    return format(int(mask), f'0{n}b')
+
+def popcount(masks):
+    """Count the '1' bits of every mask in an array."""
+    masks = np.asarray(masks, dtype=np.uint32)
+    counts = np.zeros(masks.shape, dtype=np.uint8)
+    for shift in range(0, 32, 8):
+        counts += BYTE_POPCOUNT[(masks >> np.uint32(shift)) & np.uint32(0xFF)]
+    return counts
+
+def rotate_masks(masks, shifts, n):
+    """Rotate n-bit masks left by shifts positions, so that shift i matches rotate(sequence)[i]."""
+    masks = np.asarray(masks, dtype=np.uint32)
+    shifts = np.asarray(shifts, dtype=np.uint32)
+    return ((masks << shifts) | (masks >> (np.uint32(n) - shifts))) & np.uint32((1 << n) - 1)
+
+def masks_to_bits(masks, n):
+    """Expand integer masks into uint8 rows of n bits, first position first."""
+    shifts = np.arange(n - 1, -1, -1, dtype=np.uint32)
+    return ((np.asarray(masks, dtype=np.uint32)[..., np.newaxis] >> shifts) & np.uint32(1)).astype(np.uint8)
+
+@functools.lru_cache(maxsize=None)
+def rotation_tables(n):
+    """Precompute the canonical rotation, rotation index, period and canonical rank of every n-bit mask."""
+    # The canonical rotation is the largest one, i.e. the representative unique_permutations_with_fixed_first
+    # keeps, and rotate(sequence)[rotation_index] gives it; 'order' lists canonical forms in enumeration order
+    if n > MAX_TABLE_POSITIONS:
+        raise ValueError(f"Rotation tables are limited to {MAX_TABLE_POSITIONS} positions, got {n}")
+    
+    masks = np.arange(1 << n, dtype=np.uint32)
+    canonical = masks.copy()
+    rotation_index = np.zeros(1 << n, dtype=np.uint8)
+    period = np.full(1 << n, n, dtype=np.uint8)
+    
+    for i in range(1, n):
+        rotated = rotate_masks(masks, i, n)
+        larger = rotated > canonical
+        canonical[larger] = rotated[larger]
+        rotation_index[larger] = i
+        period[(rotated == masks) & (period == n)] = i
+    
+    order = np.flatnonzero(canonical == masks)[::-1].astype(np.uint32)
+    rank = np.zeros(1 << n, dtype=np.uint32)
+    rank[order] = np.arange(len(order), dtype=np.uint32)
+    rank = rank[canonical]
+    
+    return {
+        'canonical': canonical,
+        'rotation_index': rotation_index,
+        'period': period,
+        'rank': rank,
+        'order': order,
+    }
+
+def canonical_scale_names(scales, n):
+    """Map the canonical rotation of each named scale of length n to its name, the first name winning."""
+    return _canonical_scale_names(tuple(scales.items()), n)
+
+@functools.lru_cache(maxsize=None)
+def _canonical_scale_names(scale_items, n):
+    """Build canonical_scale_names once per set of scales and length n."""
+    canonical = rotation_tables(n)['canonical']
+    names = {}
+    for name, scale in scale_items:
+        if len(scale) == n:
+            names.setdefault(int(canonical[to_mask(scale)]), name)
+    return names
+
+def match_scale(scale, scales):
+    """Return the name of the first scale in scales that the given scale is a rotation of, if any."""
+    n = len(scale)
+    if n > MAX_TABLE_POSITIONS:
+        for name, known_scale in scales.items():
+            if scale in rotate(known_scale):
+                return name
+        return None
+    return canonical_scale_names(scales, n).get(int(rotation_tables(n)['canonical'][to_mask(scale)]))
+
+def unique_permutations_with_fixed_first(n, k):
+    """Find all unique permutations of k '1's in n positions under rotation, with the first position fixed to '1'."""
+    if n <= MAX_TABLE_POSITIONS:
+        order = rotation_tables(n)['order']
+        return [to_sequence(mask, n) for mask in order[popcount(order) == k]]
+    
+    if k == 0:
+        return ['0' * n]
+    if k == n:
+        return ['1' * n]
+    
+    # Adjust k and n since we are fixing the first position to '1'
+    k = k - 1
+    n = n - 1
+    
+    combinations = list(itertools.combinations(range(n), k))
+    unique = []
+    
+    for combo in combinations:
+        sequence = ['0'] * n
+        for index in combo:
+            sequence[index] = '1'
+        sequence = '1' + ''.join(sequence)  # Ensure the first position is '1'
+        rotations = rotate(sequence)
+        
+        if not any(rot in unique for rot in rotations):
+            unique.append(sequence)
+    
+    return unique
+
+def calculate_dissimilarity(seq1, seq2):
+    """Calculate the number of dissimilar positions between two sequences."""
+    return sum(c1 != c2 for c1, c2 in zip(seq1, seq2))
+
+def find_min_dissimilarity(patterns, target_scale):
+    """Find the minimum dissimilarity between rotations of the target scale and given patterns."""
+    n = len(target_scale)
+    if n > MAX_TABLE_POSITIONS:
+        return _find_min_dissimilarity_strings(patterns, target_scale)
+    
+    shifts = np.arange(n)
+    canonical = rotation_tables(n)['canonical']
+    
+    # Compare every rotation of every pattern against every target rotation at once: (patterns, n, n)
+    target_rotations = rotate_masks(to_mask(target_scale), shifts, n)
+    pattern_masks = np.array([to_mask(pattern) for pattern in patterns], dtype=np.uint32)
+    pattern_rotations = rotate_masks(pattern_masks[:, np.newaxis], shifts, n)
+    dissimilarities = popcount(pattern_rotations[:, :, np.newaxis] ^ target_rotations)
+    min_dissimilarities = dissimilarities.min(axis=(1, 2))
+    
+    min_dissimilarity_results = []
+    
+    for pattern, rotations, pattern_dissimilarities, min_dissimilarity in zip(
+            patterns, pattern_rotations, dissimilarities, min_dissimilarities):
+        pat_indices, target_indices = np.nonzero(pattern_dissimilarities == min_dissimilarity)
+        best_pat_rots = rotations[pat_indices]
+        
+        # Keep only the first best match of each rotation class
+        _, first_matches = np.unique(canonical[best_pat_rots], return_index=True)
+        unique_matches = [
+            (to_sequence(best_pat_rots[m], n), to_sequence(target_rotations[target_indices[m]], n))
+            for m in np.sort(first_matches)
+        ]
+        
+        min_dissimilarity_results.append((pattern, int(min_dissimilarity), unique_matches))
+    
+    return min_dissimilarity_results
+
+def _find_min_dissimilarity_strings(patterns, target_scale):
+    """Find the minimum dissimilarities by comparing rotated strings, for scales too long to tabulate."""
+    target_rotations = rotate(target_scale)
+    
+    min_dissimilarity_results = []
+    
+    for pattern in patterns:
+        pattern_rotations = rotate(pattern)
+        min_dissimilarity = float('inf')
+        best_matches = []
+        
+        for pat_rot in pattern_rotations:
+            for target_rot in target_rotations:
+                dissimilarity = calculate_dissimilarity(pat_rot, target_rot)
+                if dissimilarity < min_dissimilarity:
+                    min_dissimilarity = dissimilarity
+                    best_matches = [(pat_rot, target_rot)]
+                elif dissimilarity == min_dissimilarity:
+                    best_matches.append((pat_rot, target_rot))
+        
+        unique_matches = []
+        seen_patterns = set()
+        for pat_rot, target_rot in best_matches:
+            pat_tuple = tuple(int(char) for char in pat_rot)
+            if pat_tuple not in seen_patterns:
+                seen_patterns.update(tuple(int(char) for char in rot) for rot in rotate(pat_rot))
+                unique_matches.append((pat_rot, target_rot))
+        
+        min_dissimilarity_results.append((pattern, min_dissimilarity, unique_matches))
+    
+    return min_dissimilarity_results